@@ -33,8 +33,3 @@ def create_app():
         return {"status": "ok"}
 
     return app
-
-
-if __name__ == "__main__":
-    app = create_app()
-    app.run(host="0.0.0.0", port=5001, debug=config.DEBUG)
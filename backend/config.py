@@ -28,10 +28,22 @@ class Config:
             f"@{self.DB_HOST}:{self.DB_PORT}/{self.POSTGRES_DB}"
         )
 
+    # Session store
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
     # AI Services
     OLLAMA_URL = os.getenv('OLLAMA_URL', 'http://localhost:11434')
     OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama3.2')
     QDRANT_URL = os.getenv('QDRANT_URL', 'http://localhost:6333')
+    QDRANT_GRPC_PORT = int(os.getenv('QDRANT_GRPC_PORT', '6334'))
+    QDRANT_PREFER_GRPC = os.getenv('QDRANT_PREFER_GRPC', 'True').lower() == 'true'
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.92'))
+    SEMANTIC_CACHE_TTL = int(os.getenv('SEMANTIC_CACHE_TTL', '3600'))
+    SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '10000'))
+
+    # Embeddings: optional ONNX Runtime model (empty path = PyTorch SentenceTransformer)
+    EMBEDDING_ONNX_PATH = os.getenv('EMBEDDING_ONNX_PATH', '')
+    EMBEDDING_ONNX_FILE = os.getenv('EMBEDDING_ONNX_FILE', 'model_quantized.onnx')
 
     # LLM Provider
     LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'ollama')
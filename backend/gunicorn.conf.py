@@ -0,0 +1,32 @@
+"""Gunicorn settings for the Flask backend.
+
+Run with: gunicorn -c gunicorn.conf.py 'app:create_app()'
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5001")
+
+# The workload is I/O-bound on Ollama, Qdrant and Postgres, so cooperative
+# gevent workers keep many requests in flight per process.
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2))
+worker_class = "gevent"
+worker_connections = 1000
+
+# LLM calls may take up to 120s
+timeout = 180
+
+
+def post_fork(server, worker):
+    # psycopg2 is a C extension that monkey-patching cannot reach; make its
+    # socket waits yield to the gevent hub so queries do not block the worker.
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+
+
+def post_worker_init(worker):
+    # The Qdrant client talks gRPC; grpcio's C core needs its gevent
+    # integration, installed after the worker has monkey-patched the stdlib.
+    import grpc.experimental.gevent as grpc_gevent
+    grpc_gevent.init_gevent()
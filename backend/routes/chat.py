@@ -1,18 +1,18 @@
 """Chat API routes — the core RAG pipeline."""
 
+import json
+import re
 import uuid
 import logging
-from flask import Blueprint, request, jsonify
-from services.database_service import DatabaseService
-from services.embedding_service import EmbeddingService
-from services.llm_client import LLMClient
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from services.database_service import get_database_service
+from services.embedding_service import encode, get_embedding_service
+from services.llm_client import get_llm_client
+from services import semantic_cache, session_store
 
 logger = logging.getLogger(__name__)
 bp = Blueprint("chat", __name__, url_prefix="/api/chat")
 
-# In-memory session store (good enough for MVP)
-_sessions: dict[str, list] = {}
-
 DB_KEYWORDS = {
     "show", "select", "query", "database", "table", "customer", "account",
     "transaction", "loan", "payment", "branch", "how many", "count",
@@ -21,10 +21,12 @@ DB_KEYWORDS = {
     "credit", "card", "balance", "amount",
 }
 
+# One alternation scanned in a single pass instead of a substring test per keyword
+_KW_RE = re.compile("|".join(map(re.escape, sorted(DB_KEYWORDS))))
+
 
 def _is_database_query(msg: str) -> bool:
-    lower = msg.lower()
-    return any(kw in lower for kw in DB_KEYWORDS)
+    return _KW_RE.search(msg.lower()) is not None
 
 
 @bp.route("", methods=["POST"])
@@ -36,20 +38,25 @@ def chat():
         return jsonify({"error": "Message is required"}), 400
 
     session_id = data.get("session_id") or str(uuid.uuid4())
-    if session_id not in _sessions:
-        _sessions[session_id] = []
 
     # Store user message
     user_entry = {"role": "user", "content": message}
-    _sessions[session_id].append(user_entry)
+    session_store.append_message(session_id, user_entry)
 
     try:
-        if _is_database_query(message):
-            response_content, sql_query, sql_result = _handle_db_query(message)
+        qvec = encode(message)
+        cached = semantic_cache.lookup(qvec)
+        if cached is not None:
+            response_content = cached["content"]
+            sql_query = cached.get("sql_query")
+            sql_result = cached.get("sql_result")
         else:
-            response_content = _handle_general_query(message)
-            sql_query = None
-            sql_result = None
+            if _is_database_query(message):
+                response_content, sql_query, sql_result = _handle_db_query(message)
+            else:
+                response_content = _handle_general_query(message)
+                sql_query = None
+                sql_result = None
 
         assistant_entry = {
             "role": "assistant",
@@ -57,7 +64,7 @@ def chat():
             "sql_query": sql_query,
             "sql_result": sql_result,
         }
-        _sessions[session_id].append(assistant_entry)
+        _remember(session_id, qvec, assistant_entry, cached=cached is not None)
 
         return jsonify({"success": True, "session_id": session_id, "message": assistant_entry})
 
@@ -66,20 +73,73 @@ def chat():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@bp.route("/stream", methods=["POST"])
+def chat_stream():
+    """Handle a chat message, streaming the answer as Server-Sent Events.
+
+    Events: ``meta`` (session id, SQL and result, sent before the answer),
+    ``token`` (answer text chunks), ``done`` (final message) or ``error``.
+    """
+    data = request.get_json(force=True)
+    message = data.get("message", "").strip()
+    if not message:
+        return jsonify({"error": "Message is required"}), 400
+
+    session_id = data.get("session_id") or str(uuid.uuid4())
+    session_store.append_message(session_id, {"role": "user", "content": message})
+
+    def generate():
+        try:
+            qvec = encode(message)
+            cached = semantic_cache.lookup(qvec)
+            sql_query = sql_result = None
+            if cached is not None:
+                sql_query = cached.get("sql_query")
+                sql_result = cached.get("sql_result")
+                chunks = iter([cached["content"]])
+            elif _is_database_query(message):
+                sql_query, sql_result = _run_sql(message)
+                chunks = get_llm_client().generate_response_stream(message, sql_query, sql_result)
+            else:
+                chunks = iter([_handle_general_query(message)])
+
+            yield _sse("meta", {"session_id": session_id, "sql_query": sql_query, "sql_result": sql_result})
+
+            parts = []
+            for chunk in chunks:
+                parts.append(chunk)
+                yield _sse("token", {"content": chunk})
+
+            assistant_entry = {
+                "role": "assistant",
+                "content": "".join(parts).strip(),
+                "sql_query": sql_query,
+                "sql_result": sql_result,
+            }
+            _remember(session_id, qvec, assistant_entry, cached=cached is not None)
+            yield _sse("done", {"session_id": session_id, "message": assistant_entry})
+
+        except Exception as e:
+            logger.exception("Chat stream error")
+            yield _sse("error", {"error": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @bp.route("/sessions", methods=["GET"])
 def list_sessions():
     """List all chat sessions."""
-    out = []
-    for sid, msgs in _sessions.items():
-        preview = msgs[0]["content"][:80] if msgs else ""
-        out.append({"session_id": sid, "message_count": len(msgs), "preview": preview})
-    return jsonify(out)
+    return jsonify(session_store.list_sessions())
 
 
 @bp.route("/sessions/<session_id>", methods=["GET"])
 def get_session(session_id):
     """Get all messages in a session."""
-    msgs = _sessions.get(session_id)
+    msgs = session_store.get_messages(session_id)
     if msgs is None:
         return jsonify({"error": "Session not found"}), 404
     return jsonify({"session_id": session_id, "messages": msgs})
@@ -89,23 +149,44 @@ def get_session(session_id):
 # Internal helpers
 # ------------------------------------------------------------------
 
-def _handle_db_query(message: str):
-    emb = EmbeddingService()
+def _run_sql(message: str):
+    emb = get_embedding_service()
     schemas = emb.search_similar_schemas(message)
 
-    llm = LLMClient()
+    llm = get_llm_client()
     sql = llm.generate_sql(message, schemas)
 
-    db = DatabaseService()
+    db = get_database_service()
     result = db.execute_safe_query(sql)
+    return sql, result
+
 
-    response = llm.generate_response(message, sql, result)
+def _handle_db_query(message: str):
+    sql, result = _run_sql(message)
+    response = get_llm_client().generate_response(message, sql, result)
     return response, sql, result
 
 
 def _handle_general_query(message: str):
     try:
-        llm = LLMClient()
+        llm = get_llm_client()
         return llm.generate_brief_response(message)
     except Exception:
         return "I'm designed to help with database queries about banking data."
+
+
+def _remember(session_id: str, qvec: list[float], assistant_entry: dict, cached: bool):
+    """Persist the answer to the session and, when fresh and successful, the semantic cache."""
+    session_store.append_message(session_id, assistant_entry)
+    sql_result = assistant_entry["sql_result"]
+    # Only cache answers worth replaying; failed queries should be retried
+    if not cached and (sql_result is None or sql_result.get("success")):
+        semantic_cache.insert(qvec, {
+            "content": assistant_entry["content"],
+            "sql_query": assistant_entry["sql_query"],
+            "sql_result": sql_result,
+        })
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -1,24 +1,25 @@
 """Database introspection & direct query API routes."""
 
 from flask import Blueprint, request, jsonify
-from services.database_service import DatabaseService
+from services.database_service import get_database_service
 
 bp = Blueprint("database", __name__, url_prefix="/api/database")
 
 
 @bp.route("/test", methods=["GET"])
 def test_connection():
-    return jsonify(DatabaseService().test_connection())
+    return jsonify(get_database_service().test_connection())
 
 
 @bp.route("/tables", methods=["GET"])
 def list_tables():
-    return jsonify(DatabaseService().get_database_stats())
+    exact = request.args.get("exact", "").lower() in ("1", "true")
+    return jsonify(get_database_service().get_database_stats(exact=exact))
 
 
 @bp.route("/tables/<table_name>", methods=["GET"])
 def table_info(table_name):
-    return jsonify(DatabaseService().get_table_info(table_name))
+    return jsonify(get_database_service().get_table_info(table_name))
 
 
 @bp.route("/execute", methods=["POST"])
@@ -28,4 +29,5 @@ def execute_query():
     sql = data.get("query", "").strip()
     if not sql:
         return jsonify({"error": "Query is required"}), 400
-    return jsonify(DatabaseService().execute_safe_query(sql))
+    pretty = request.args.get("pretty", "").lower() in ("1", "true")
+    return jsonify(get_database_service().execute_safe_query(sql, pretty=pretty))
@@ -1,7 +1,7 @@
 """Embeddings API routes for schema management."""
 
 from flask import Blueprint, request, jsonify
-from services.embedding_service import EmbeddingService
+from services.embedding_service import get_embedding_service
 
 bp = Blueprint("embeddings", __name__, url_prefix="/api/embeddings")
 
@@ -14,7 +14,7 @@ def embed_schema():
     if not table_name or not ddl:
         return jsonify({"error": "table_name and ddl_statement are required"}), 400
 
-    eid = EmbeddingService().embed_schema(table_name, ddl, data.get("description", ""))
+    eid = get_embedding_service().embed_schema(table_name, ddl, data.get("description", ""))
     return jsonify({"success": True, "embedding_id": eid, "table_name": table_name})
 
 
@@ -25,10 +25,10 @@ def search_schemas():
     if not query:
         return jsonify({"error": "query is required"}), 400
 
-    results = EmbeddingService().search_similar_schemas(query, limit=data.get("limit", 3))
+    results = get_embedding_service().search_similar_schemas(query, limit=data.get("limit", 3))
     return jsonify({"success": True, "results": results})
 
 
 @bp.route("/schemas", methods=["GET"])
 def list_schemas():
-    return jsonify({"success": True, "schemas": EmbeddingService().get_all_schemas()})
+    return jsonify({"success": True, "schemas": get_embedding_service().get_all_schemas()})
@@ -1,10 +1,12 @@
 """Database service for safe, read-only SQL execution."""
 
 import logging
-import threading
-from decimal import Decimal
-from datetime import datetime, date, time
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import methodcaller
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
 from config import config
 import sqlparse
 
@@ -18,6 +20,20 @@ engine = create_engine(
 )
 
 
+# Postgres type OIDs whose driver values are not JSON-native
+_NUMERIC_OID = 1700  # numeric -> Decimal
+_TEMPORAL_OIDS = {1082, 1083, 1114, 1184, 1266}  # date, time, timestamp, timestamptz, timetz
+
+_isoformat = methodcaller("isoformat")
+
+# Statement must open with SELECT/WITH, optionally after comments/whitespace.
+# The block-comment branch can only end at the first "*/", so comments cannot
+# be split in multiple ways and the match stays linear (no backtracking blow-up).
+_LEAD_RE = re.compile(r"^(?:\s|/\*[^*]*\*+(?:[^/*][^*]*\*+)*/|--[^\n]*\n)*(?:SELECT|WITH)\b", re.I)
+# Keyword token types that can modify data, schema or privileges
+_WRITE_TTYPES = (sqlparse.tokens.Keyword.DML, sqlparse.tokens.Keyword.DDL, sqlparse.tokens.Keyword.DCL)
+
+
 class QueryTimeoutException(Exception):
     """Raised when a query exceeds the configured timeout."""
     pass
@@ -32,13 +48,16 @@ class DatabaseService:
     # Public API
     # ------------------------------------------------------------------
 
-    def execute_safe_query(self, sql_query: str) -> dict:
-        """Execute a SQL query with read-only safety constraints."""
+    def execute_safe_query(self, sql_query: str, pretty: bool = False) -> dict:
+        """Execute a SQL query with read-only safety constraints.
+
+        The query runs as written; ``pretty=True`` reindents the echoed query.
+        """
         try:
             if not self._is_safe_query(sql_query):
                 raise ValueError("Query contains potentially unsafe operations")
 
-            parsed_query = self._parse_and_format_query(sql_query)
+            parsed_query = self._parse_and_format_query(sql_query) if pretty else sql_query
             result = self._execute_with_timeout(parsed_query)
 
             return {
@@ -61,8 +80,12 @@ class DatabaseService:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    def get_database_stats(self) -> dict:
-        """Return table list with row counts and descriptions."""
+    def get_database_stats(self, exact: bool = False) -> dict:
+        """Return table list with row counts and descriptions.
+
+        Row counts come from planner statistics in a single catalog query;
+        pass ``exact=True`` to run ``COUNT(*)`` per table instead.
+        """
         descriptions = {
             "branches": "Bank branch locations and contact information",
             "customers": "Customer personal and financial information",
@@ -77,21 +100,31 @@ class DatabaseService:
             tables = []
             total_rows = 0
             with engine.connect() as conn:
+                # reltuples is -1 until the table is first analyzed; fall back to
+                # the live-tuple counter maintained by the stats collector.
                 rows = conn.execute(text(
-                    "SELECT table_name FROM information_schema.tables "
-                    "WHERE table_schema='public' AND table_type='BASE TABLE' ORDER BY table_name"
+                    "SELECT c.relname, "
+                    "CASE WHEN c.reltuples < 0 THEN COALESCE(s.n_live_tup, 0) "
+                    "ELSE c.reltuples END::bigint "
+                    "FROM pg_class c "
+                    "JOIN pg_namespace n ON n.oid = c.relnamespace "
+                    "LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid "
+                    "WHERE n.nspname = 'public' AND c.relkind = 'r' ORDER BY c.relname"
                 )).fetchall()
 
-                for (table_name,) in rows:
-                    if table_name.startswith(("pg_", "sql_")):
-                        continue
-                    cnt = conn.execute(text(f'SELECT COUNT(*) FROM "{table_name}"')).scalar()
-                    tables.append({
-                        "table_name": table_name,
-                        "row_count": cnt,
-                        "description": descriptions.get(table_name, f"Table: {table_name}"),
-                    })
-                    total_rows += cnt
+            counts = {t: cnt for t, cnt in rows if not t.startswith(("pg_", "sql_"))}
+            if exact and counts:
+                # Each COUNT(*) is independent; run them on separate pooled connections
+                with ThreadPoolExecutor(max_workers=min(8, len(counts))) as pool:
+                    counts = dict(pool.map(self._count_rows, counts))
+
+            for table_name, cnt in counts.items():
+                tables.append({
+                    "table_name": table_name,
+                    "row_count": cnt,
+                    "description": descriptions.get(table_name, f"Table: {table_name}"),
+                })
+                total_rows += cnt
 
             return {"success": True, "total_tables": len(tables), "total_rows": total_rows, "tables": tables}
         except Exception as e:
@@ -123,75 +156,91 @@ class DatabaseService:
     # ------------------------------------------------------------------
 
     @staticmethod
-    def _serialize_value(value):
-        if isinstance(value, Decimal):
-            return float(value)
-        if isinstance(value, (datetime, date, time)):
-            return value.isoformat()
-        return value
+    def _count_rows(table_name: str) -> tuple[str, int]:
+        with engine.connect() as conn:
+            return table_name, conn.execute(text(f'SELECT COUNT(*) FROM "{table_name}"')).scalar()
+
+    @staticmethod
+    def _column_converters(description) -> list:
+        """Pick one serializer per result column from the cursor's type OIDs."""
+        converters = []
+        for col in description or ():
+            if col.type_code == _NUMERIC_OID:
+                converters.append(float)
+            elif col.type_code in _TEMPORAL_OIDS:
+                converters.append(_isoformat)
+            else:
+                converters.append(None)
+        return converters
 
     @staticmethod
     def _is_safe_query(sql_query: str) -> bool:
-        """Only allow SELECT / WITH (CTE) statements."""
-        parsed = sqlparse.parse(sql_query)
-        if not parsed:
+        """Only allow SELECT / WITH (CTE) statements.
+
+        A regex rejects anything not opening with SELECT/WITH up front; the rest
+        is checked on parsed tokens, so keywords inside identifiers, string
+        literals or comments (e.g. an ``update_time`` column) are not flagged.
+        """
+        if not _LEAD_RE.match(sql_query):
             return False
 
-        dangerous = {"INSERT", "UPDATE", "DELETE", "DROP", "ALTER", "TRUNCATE", "EXEC", "EXECUTE", "CALL", "MERGE", "UPSERT"}
-        upper = sql_query.upper()
-        for kw in dangerous:
-            if kw in upper:
+        statements = [st for st in sqlparse.parse(sql_query) if st.token_first(skip_cm=True) is not None]
+        if not statements:
+            return False
+        for stmt in statements:
+            if stmt.token_first(skip_cm=True).normalized not in ("SELECT", "WITH"):
                 return False
-
-        for stmt in parsed:
-            first = None
-            for token in stmt.flatten():
-                if token.ttype not in (
-                    sqlparse.tokens.Comment.Single,
-                    sqlparse.tokens.Comment.Multiline,
-                    sqlparse.tokens.Whitespace,
-                    sqlparse.tokens.Newline,
-                ):
-                    first = token
-                    break
-            if first is None:
-                continue
-            val = first.value.upper()
-            if val not in ("SELECT", "WITH"):
+            if stmt.get_type() not in ("SELECT", "UNKNOWN"):
                 return False
+            for token in stmt.flatten():
+                if token.ttype in _WRITE_TTYPES and token.normalized != "SELECT":
+                    return False
+                # SELECT ... INTO creates a table
+                if token.ttype is sqlparse.tokens.Keyword and token.normalized == "INTO":
+                    return False
         return True
 
     def _parse_and_format_query(self, sql_query: str) -> str:
         try:
-            formatted = sqlparse.format(sql_query, reindent=True, keyword_case="upper")
-            if "LIMIT" not in formatted.upper():
-                formatted = f"{formatted.rstrip(';')} LIMIT {self.max_rows};"
-            return formatted
+            return sqlparse.format(sql_query, reindent=True, keyword_case="upper")
         except Exception:
             return sql_query
 
+    def _wrap_with_limit(self, sql_query: str) -> str:
+        """Cap the result set server-side so Postgres never streams excess rows."""
+        # Comments go first: a terminator followed by "-- note" must still be stripped,
+        # and a trailing "-- comment" would otherwise swallow the closing paren
+        inner = sqlparse.format(sql_query, strip_comments=True).strip().rstrip(";").rstrip()
+        return f"SELECT * FROM (\n{inner}\n) _limited_q LIMIT {self.max_rows}"
+
     def _execute_with_timeout(self, sql_query: str) -> dict:
         result = {"data": [], "columns": [], "row_count": 0}
-        exc_box = [None]
-
-        def _run():
-            try:
-                with engine.connect() as conn:
-                    rs = conn.execute(text(sql_query))
-                    if rs.returns_rows:
-                        result["columns"] = list(rs.keys())
-                        rows = rs.fetchmany(self.max_rows)
-                        result["data"] = [[self._serialize_value(v) for v in r] for r in rows]
-                        result["row_count"] = len(rows)
-            except Exception as e:
-                exc_box[0] = e
-
-        t = threading.Thread(target=_run, daemon=True)
-        t.start()
-        t.join(timeout=self.timeout)
-
-        if t.is_alive():
-            raise QueryTimeoutException(f"Query timed out after {self.timeout}s")
-        if exc_box[0]:
-            raise exc_box[0]
+        try:
+            with engine.connect() as conn:
+                # Server-side timeout: Postgres cancels the statement itself, so no
+                # worker thread or connection is left behind on timeout.
+                conn.execute(text(f"SET LOCAL statement_timeout = {int(self.timeout * 1000)}"))
+                rs = conn.execute(text(self._wrap_with_limit(sql_query)))
+                if rs.returns_rows:
+                    result["columns"] = list(rs.keys())
+                    converters = self._column_converters(rs.cursor.description)
+                    rows = rs.fetchmany(self.max_rows)
+                    if any(converters):
+                        result["data"] = [
+                            [v if c is None or v is None else c(v) for c, v in zip(converters, r)]
+                            for r in rows
+                        ]
+                    else:
+                        result["data"] = [list(r) for r in rows]
+                    result["row_count"] = len(rows)
+        except OperationalError as e:
+            if getattr(e.orig, "pgcode", None) == "57014":  # query_canceled
+                raise QueryTimeoutException(f"Query timed out after {self.timeout}s") from e
+            raise
         return result
+
+
+@lru_cache(maxsize=1)
+def get_database_service() -> DatabaseService:
+    """Return the process-wide DatabaseService."""
+    return DatabaseService()
@@ -1,8 +1,14 @@
 """Embedding service for schema RAG using Qdrant + SentenceTransformers."""
 
+import asyncio
+import hashlib
 import logging
+import os
 import uuid
-from qdrant_client import QdrantClient
+from functools import lru_cache
+import numpy as np
+import torch
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.http import models
 from sentence_transformers import SentenceTransformer
 from config import config
@@ -11,44 +17,170 @@ logger = logging.getLogger(__name__)
 
 # Module-level singletons (lazy-loaded)
 _qdrant_client = None
-_st_model = None
+_collection_ensured = False
+
+
+def _qdrant_params() -> dict:
+    # gRPC ships vectors as packed protobuf floats rather than JSON decimal strings
+    return {"url": config.QDRANT_URL, "prefer_grpc": config.QDRANT_PREFER_GRPC, "grpc_port": config.QDRANT_GRPC_PORT}
 
 
 def _get_qdrant():
     global _qdrant_client
     if _qdrant_client is None:
-        _qdrant_client = QdrantClient(url=config.QDRANT_URL)
+        _qdrant_client = QdrantClient(**_qdrant_params())
     return _qdrant_client
 
 
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def _l2_normalize(x: np.ndarray) -> np.ndarray:
+    """Scale each row of an (N, D) matrix to unit length in one vectorized pass."""
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+class _OnnxEncoder:
+    """SentenceTransformer-style ``encode`` over an exported (e.g. INT8) ONNX MiniLM.
+
+    Reproduces the MiniLM pipeline: mean pooling over the attention mask,
+    then L2 normalization.
+    """
+
+    def __init__(self, model_dir: str, file_name: str):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            model_dir, file_name=file_name, provider="CPUExecutionProvider"
+        )
+
+    def encode(self, sentences, batch_size: int = 32, **_):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        chunks = []
+        for i in range(0, len(texts), batch_size):
+            enc = self.tokenizer(
+                texts[i:i + batch_size], padding=True, truncation=True, max_length=256, return_tensors="np"
+            )
+            hidden = self.model(**enc).last_hidden_state
+            mask = enc["attention_mask"][..., None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            chunks.append(_l2_normalize(pooled))
+        vectors = np.vstack(chunks) if chunks else np.empty((0, VECTOR_SIZE), dtype=np.float32)
+        return vectors[0] if single else vectors
+
+
+@lru_cache(maxsize=1)
 def _get_model():
-    global _st_model
-    if _st_model is None:
-        _st_model = SentenceTransformer("all-MiniLM-L6-v2")
-    return _st_model
+    """Load the embedding model once per process, on the GPU when one is available."""
+    if config.EMBEDDING_ONNX_PATH:
+        logger.info("Loading ONNX embedding model from %s", config.EMBEDDING_ONNX_PATH)
+        return _OnnxEncoder(config.EMBEDDING_ONNX_PATH, config.EMBEDDING_ONNX_FILE)
+    if torch.cuda.is_available():
+        # FP16 weights run on tensor cores; outputs are cast back to float32 for Qdrant
+        logger.info("Loading embedding model %s on cuda (fp16)", MODEL_NAME)
+        return SentenceTransformer(MODEL_NAME, device="cuda", model_kwargs={"torch_dtype": torch.float16})
+    logger.info("Loading embedding model %s on cpu", MODEL_NAME)
+    return SentenceTransformer(MODEL_NAME, device="cpu")
+
+
+@lru_cache(maxsize=1)
+def model_identity() -> str:
+    """Name the model variant _get_model picks, without loading it.
+
+    Vectors from different variants (ONNX export, CUDA FP16, CPU FP32) are not
+    interchangeable, so this is part of schema_hash.
+    """
+    if config.EMBEDDING_ONNX_PATH:
+        return f"onnx:{os.path.join(config.EMBEDDING_ONNX_PATH, config.EMBEDDING_ONNX_FILE)}"
+    return f"{MODEL_NAME}:{'cuda-fp16' if torch.cuda.is_available() else 'cpu-fp32'}"
+
+
+@lru_cache(maxsize=1024)
+def _encode_cached(text: str) -> tuple[float, ...]:
+    """Encode normalized text, memoizing repeated phrasings."""
+    return tuple(_get_model().encode(text).astype(np.float32, copy=False).tolist())
+
+
+def encode(text: str) -> list[float]:
+    """Return the embedding vector for text, served from the LRU cache when possible."""
+    return list(_encode_cached(text.strip().lower()))
+
+
+def _schema_text(table_name: str, ddl_statement: str, description: str = "") -> str:
+    text_to_embed = f"Table: {table_name}\n{ddl_statement}"
+    if description:
+        text_to_embed += f"\nDescription: {description}"
+    return text_to_embed
+
+
+def schema_hash(table_name: str, ddl_statement: str, description: str = "", text: str | None = None) -> str:
+    """Content hash of a schema as embedded; changes whenever it needs re-embedding.
+
+    ``text`` is the string actually embedded, defaulting to the standard schema
+    text. The model variant is included, so switching models re-embeds everything.
+    """
+    if text is None:
+        text = _schema_text(table_name, ddl_statement, description)
+    parts = (model_identity(), table_name, ddl_statement, description, text)
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+def _point_id(table_name: str) -> str:
+    # Stable per table, so re-embedding a table overwrites its point instead of duplicating it
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, table_name))
 
 
 COLLECTION = "schema_embeddings"
 VECTOR_SIZE = 384  # all-MiniLM-L6-v2 output dim
+SCORE_THRESHOLD = 0.3  # hits below this are too weak to help SQL generation
+SEARCH_PAYLOAD_FIELDS = ["table_name", "ddl_statement", "description"]
 
 
 class EmbeddingService:
     def __init__(self):
         self.client = _get_qdrant()
-        self.model = _get_model()
-        self._ensure_collection()
+        self.ensure_collection()
+
+    @property
+    def model(self):
+        # Resolved on first encode, so callers that only read Qdrant never load it
+        return _get_model()
+
+    def ensure_collection(self) -> bool:
+        """Create the schema collection if absent; return whether it is available.
 
-    def _ensure_collection(self):
+        Full vectors and payloads live on disk; searches run on INT8-quantized
+        copies held in RAM and rescore the top candidates from disk.
+        """
+        # Every public method calls this; the flag is only set on success, so after a
+        # failure (e.g. Qdrant not up yet) the next call retries instead of the cached
+        # service staying broken for the life of the worker.
+        global _collection_ensured
+        if _collection_ensured:
+            return True
         try:
-            names = [c.name for c in self.client.get_collections().collections]
-            if COLLECTION not in names:
+            if not self.client.collection_exists(COLLECTION):
                 self.client.create_collection(
                     collection_name=COLLECTION,
-                    vectors_config=models.VectorParams(size=VECTOR_SIZE, distance=models.Distance.COSINE),
+                    vectors_config=models.VectorParams(
+                        size=VECTOR_SIZE, distance=models.Distance.COSINE, on_disk=True
+                    ),
+                    on_disk_payload=True,
+                    quantization_config=models.ScalarQuantization(
+                        scalar=models.ScalarQuantizationConfig(
+                            type=models.ScalarType.INT8, quantile=0.99, always_ram=True
+                        ),
+                    ),
                 )
                 logger.info("Created Qdrant collection: %s", COLLECTION)
+            _collection_ensured = True
         except Exception as e:
             logger.error("Error ensuring collection: %s", e)
+        return _collection_ensured
 
     # ------------------------------------------------------------------
     # Public API
@@ -56,12 +188,10 @@ class EmbeddingService:
 
     def embed_schema(self, table_name: str, ddl_statement: str, description: str = "") -> str:
         """Create and store an embedding for a single table schema."""
-        text_to_embed = f"Table: {table_name}\n{ddl_statement}"
-        if description:
-            text_to_embed += f"\nDescription: {description}"
-
-        vector = self.model.encode(text_to_embed).tolist()
-        eid = str(uuid.uuid4())
+        self.ensure_collection()
+        text_to_embed = _schema_text(table_name, ddl_statement, description)
+        vector = encode(text_to_embed)
+        eid = _point_id(table_name)
 
         self.client.upsert(
             collection_name=COLLECTION,
@@ -73,7 +203,7 @@ class EmbeddingService:
                         "table_name": table_name,
                         "ddl_statement": ddl_statement,
                         "description": description,
-                        "text": text_to_embed,
+                        "ddl_hash": schema_hash(table_name, ddl_statement, description),
                     },
                 )
             ],
@@ -83,14 +213,19 @@ class EmbeddingService:
 
     def search_similar_schemas(self, query: str, limit: int = 3) -> list:
         """Search for schemas most relevant to a user query."""
+        self.ensure_collection()
         try:
-            qvec = self.model.encode(query).tolist()
-            hits = self.client.search(
+            qvec = encode(query)
+            hits = self.client.query_points(
                 collection_name=COLLECTION,
-                query_vector=qvec,
+                query=qvec,
                 limit=limit,
-                with_payload=True,
-            )
+                with_payload=SEARCH_PAYLOAD_FIELDS,
+                score_threshold=SCORE_THRESHOLD,
+                search_params=models.SearchParams(
+                    quantization=models.QuantizationSearchParams(rescore=True, oversampling=2.0),
+                ),
+            ).points
             return [
                 {
                     "table_name": h.payload["table_name"],
@@ -104,16 +239,95 @@ class EmbeddingService:
             logger.error("Error searching schemas: %s", e)
             return []
 
-    def embed_all_schemas(self, schema_definitions: list):
-        """Batch embed a list of {table_name, ddl_statement, description} dicts."""
-        for s in schema_definitions:
-            try:
-                self.embed_schema(s["table_name"], s["ddl_statement"], s.get("description", ""))
-            except Exception as e:
-                logger.error("Failed to embed %s: %s", s["table_name"], e)
+    def embed_texts_batch(self, texts: list[str]) -> np.ndarray:
+        """Encode many texts in a single model call, returning an (N, D) array."""
+        vectors = self.model.encode(
+            texts,
+            batch_size=max(1, min(len(texts), 64)),
+            show_progress_bar=False,
+            convert_to_numpy=True,
+        )
+        return _l2_normalize(vectors.astype(np.float32, copy=False))
+
+    async def aembed_all_schemas(
+        self, schema_definitions: list, texts: list[str] | None = None, chunk_size: int = 64, concurrency: int = 4
+    ) -> bool:
+        """Batch embed a sequence of (table_name, ddl_statement, description) tuples.
+
+        All texts go through one batched encode; upserts of ``chunk_size``
+        points then run in parallel over an AsyncQdrantClient, with at most
+        ``concurrency`` requests in flight. ``texts`` optionally overrides the
+        string embedded for each schema; payloads keep the full DDL either way.
+        Returns False (after logging) if encoding or any upsert failed.
+        """
+        if not schema_definitions:
+            return True
+        self.ensure_collection()
+        sem = asyncio.Semaphore(concurrency)
+        # Created per call: the async client is bound to the running event loop
+        client = AsyncQdrantClient(**_qdrant_params())
+
+        async def _upsert(chunk):
+            async with sem:
+                await client.upsert(collection_name=COLLECTION, points=chunk)
+
+        try:
+            points = self._schema_points(schema_definitions, texts)
+            chunks = [points[i:i + chunk_size] for i in range(0, len(points), chunk_size)]
+            await asyncio.gather(*(_upsert(c) for c in chunks))
+            logger.info("Embedded %d schemas", len(schema_definitions))
+            return True
+        except Exception as e:
+            logger.error("Failed to embed schemas: %s", e)
+            return False
+        finally:
+            await client.close()
+
+    def _schema_points(self, schema_definitions: list, texts: list[str] | None = None) -> list:
+        if texts is None:
+            texts = [_schema_text(*row) for row in schema_definitions]
+        vectors = self.embed_texts_batch(texts)
+        return [
+            models.PointStruct(
+                id=_point_id(table_name),
+                vector=v.tolist(),
+                payload={
+                    "table_name": table_name,
+                    "ddl_statement": ddl_statement,
+                    "description": description,
+                    "ddl_hash": schema_hash(table_name, ddl_statement, description, t),
+                },
+            )
+            for v, (table_name, ddl_statement, description), t in zip(vectors, schema_definitions, texts)
+        ]
+
+    def count_schemas(self, exact: bool = False) -> int:
+        """Return the number of stored schema points (approximate unless ``exact``)."""
+        return self.client.count(collection_name=COLLECTION, exact=exact).count
+
+    def delete_stale_schemas(self) -> int:
+        """Delete points not stored under their table's deterministic id; return how many.
+
+        Collections seeded before ids were derived from table names hold
+        random-id points that would otherwise shadow or duplicate the current ones.
+        """
+        self.ensure_collection()
+        stale, offset = [], None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=COLLECTION, limit=256, offset=offset, with_payload=["table_name"]
+            )
+            stale += [p.id for p in points if str(p.id) != _point_id(p.payload.get("table_name", ""))]
+            if offset is None:
+                break
+        if stale:
+            self.client.delete(collection_name=COLLECTION, points_selector=models.PointIdsList(points=stale))
+            logger.info("Deleted %d stale schema points", len(stale))
+        return len(stale)
 
     def get_all_schemas(self) -> list:
         """Return all stored schema payloads from Qdrant."""
+        self.ensure_collection()
         try:
             result = self.client.scroll(collection_name=COLLECTION, limit=100, with_payload=True)
             points = result[0] if result else []
@@ -122,9 +336,16 @@ class EmbeddingService:
                     "table_name": p.payload["table_name"],
                     "ddl_statement": p.payload["ddl_statement"],
                     "description": p.payload.get("description", ""),
+                    "ddl_hash": p.payload.get("ddl_hash"),
                 }
                 for p in points
             ]
         except Exception as e:
             logger.error("Error listing schemas: %s", e)
             return []
+
+
+@lru_cache(maxsize=1)
+def get_embedding_service() -> EmbeddingService:
+    """Return the process-wide EmbeddingService."""
+    return EmbeddingService()
@@ -1,12 +1,78 @@
 """LLM client supporting Ollama and Gemini providers."""
 
+import json
 import logging
 import os
-import requests
+import httpx
+from functools import lru_cache
 from config import config
 
 logger = logging.getLogger(__name__)
 
+# Shared keep-alive pool so Ollama calls reuse connections instead of
+# opening a fresh TCP connection per request.
+_http = httpx.Client(
+    http2=True,
+    timeout=httpx.Timeout(120.0, connect=10.0),
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=50, keepalive_expiry=30.0),
+)
+
+
+_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def _deterministic_response(query_result: dict) -> str | None:
+    """Answer without the LLM when a template says everything there is to say.
+
+    Covers failed queries, empty results and tiny results (up to 3 rows of up
+    to 3 scalar columns); returns None when the result deserves a summary.
+    """
+    if not query_result.get("success"):
+        return f"The query failed: {query_result.get('error', 'Unknown error')}"
+    rc = query_result.get("row_count", 0)
+    if rc == 0:
+        return "No matching records were found."
+
+    cols = query_result.get("columns", [])
+    data = query_result.get("data", [])
+    if rc > 3 or len(cols) > 3 or not all(isinstance(v, _SCALAR_TYPES) for row in data for v in row):
+        return None
+    lines = [", ".join(f"{c}: {v}" for c, v in zip(cols, row)) for row in data]
+    if rc == 1:
+        return f"Result: {lines[0]}."
+    return f"Found {rc} results:\n" + "\n".join(f"- {line}" for line in lines)
+
+
+def _build_response_prompt(user_question: str, sql_query: str, query_result: dict) -> tuple[str, str]:
+    """Return (prompt, system prompt) for summarizing a query result."""
+    system = (
+        "You are a helpful data analyst. Answer clearly and concisely.\n"
+        "Rules:\n1. Answer in natural language\n2. Be specific with numbers\n"
+        "3. Keep responses under 200 words\n4. Highlight key insights"
+    )
+    if query_result.get("success"):
+        data = query_result.get("data", [])
+        cols = query_result.get("columns", [])
+        rc = query_result.get("row_count", 0)
+        if rc == 0:
+            result_text = "No results found."
+        else:
+            result_text = f"Found {rc} result(s).\nColumns: {', '.join(cols)}\n"
+            for i, row in enumerate(data[:3]):
+                result_text += f"Row {i+1}: {dict(zip(cols, row))}\n"
+            if rc > 3:
+                result_text += f"... and {rc - 3} more rows"
+    else:
+        result_text = f"Query failed: {query_result.get('error', 'Unknown error')}"
+
+    prompt = (
+        f"User Question: {user_question}\n\n"
+        f"SQL Query Used: {sql_query}\n\n"
+        f"Query Results: {result_text}\n\n"
+        "Provide a helpful response:"
+    )
+    return prompt, system
+
 
 class OllamaClient:
     """Client for local Ollama LLM."""
@@ -20,13 +86,32 @@ class OllamaClient:
         if system_prompt:
             payload["system"] = system_prompt
         try:
-            resp = requests.post(f"{self.base_url}/api/generate", json=payload, timeout=120)
+            resp = _http.post(f"{self.base_url}/api/generate", json=payload)
             resp.raise_for_status()
             return resp.json().get("response", "").strip()
         except Exception as e:
             logger.error("Ollama request failed: %s", e)
             raise
 
+    def _make_request_stream(self, prompt: str, system_prompt: str | None = None):
+        payload = {"model": self.model, "prompt": prompt, "stream": True}
+        if system_prompt:
+            payload["system"] = system_prompt
+        try:
+            with _http.stream("POST", f"{self.base_url}/api/generate", json=payload) as resp:
+                resp.raise_for_status()
+                for line in resp.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        break
+        except Exception as e:
+            logger.error("Ollama streaming request failed: %s", e)
+            raise
+
     def generate_sql(self, user_question: str, relevant_schemas: list) -> str:
         system = (
             "You are a SQL expert. Generate accurate, safe PostgreSQL queries.\n"
@@ -47,37 +132,32 @@ class OllamaClient:
         return sql
 
     def generate_response(self, user_question: str, sql_query: str, query_result: dict) -> str:
-        system = (
-            "You are a helpful data analyst. Answer clearly and concisely.\n"
-            "Rules:\n1. Answer in natural language\n2. Be specific with numbers\n"
-            "3. Keep responses under 200 words\n4. Highlight key insights"
-        )
-        if query_result.get("success"):
-            data = query_result.get("data", [])
-            cols = query_result.get("columns", [])
-            rc = query_result.get("row_count", 0)
-            if rc == 0:
-                result_text = "No results found."
-            else:
-                result_text = f"Found {rc} result(s).\nColumns: {', '.join(cols)}\n"
-                for i, row in enumerate(data[:3]):
-                    result_text += f"Row {i+1}: {dict(zip(cols, row))}\n"
-                if rc > 3:
-                    result_text += f"... and {rc - 3} more rows"
-        else:
-            result_text = f"Query failed: {query_result.get('error', 'Unknown error')}"
-
-        prompt = (
-            f"User Question: {user_question}\n\n"
-            f"SQL Query Used: {sql_query}\n\n"
-            f"Query Results: {result_text}\n\n"
-            "Provide a helpful response:"
-        )
+        templated = _deterministic_response(query_result)
+        if templated is not None:
+            return templated
+        prompt, system = _build_response_prompt(user_question, sql_query, query_result)
         try:
             return self._make_request(prompt, system)
         except Exception:
             return f"Found {query_result.get('row_count', 0)} results for your query."
 
+    def generate_response_stream(self, user_question: str, sql_query: str, query_result: dict):
+        """Yield the natural-language answer in chunks as the model produces them."""
+        templated = _deterministic_response(query_result)
+        if templated is not None:
+            yield templated
+            return
+        prompt, system = _build_response_prompt(user_question, sql_query, query_result)
+        produced = False
+        try:
+            for chunk in self._make_request_stream(prompt, system):
+                produced = True
+                yield chunk
+        except Exception:
+            if produced:
+                raise
+            yield f"Found {query_result.get('row_count', 0)} results for your query."
+
     def generate_brief_response(self, user_question: str) -> str:
         system = "You are a database assistant. For non-database questions, provide a very brief response (under 50 words) and redirect to database topics."
         prompt = f"Question: {user_question}\n\nBrief response:"
@@ -89,7 +169,7 @@ class OllamaClient:
 
     def test_connection(self) -> dict:
         try:
-            r = requests.get(f"{self.base_url}/api/tags", timeout=10)
+            r = _http.get(f"{self.base_url}/api/tags", timeout=10)
             r.raise_for_status()
             return {"success": True, "message": "Ollama connected", "model": self.model, "provider": "ollama"}
         except Exception as e:
@@ -113,6 +193,15 @@ class GeminiClient:
         resp = self.model.generate_content(full, generation_config={"temperature": 0.1, "max_output_tokens": 500})
         return resp.text.strip()
 
+    def _make_request_stream(self, prompt: str, system_prompt: str | None = None):
+        full = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+        resp = self.model.generate_content(
+            full, generation_config={"temperature": 0.1, "max_output_tokens": 500}, stream=True
+        )
+        for chunk in resp:
+            if chunk.text:
+                yield chunk.text
+
     # Delegate same interface as OllamaClient ---
     def generate_sql(self, user_question, relevant_schemas):
         return OllamaClient.generate_sql(self, user_question, relevant_schemas)
@@ -120,6 +209,9 @@ class GeminiClient:
     def generate_response(self, user_question, sql_query, query_result):
         return OllamaClient.generate_response(self, user_question, sql_query, query_result)
 
+    def generate_response_stream(self, user_question, sql_query, query_result):
+        return OllamaClient.generate_response_stream(self, user_question, sql_query, query_result)
+
     def generate_brief_response(self, user_question):
         return OllamaClient.generate_brief_response(self, user_question)
 
@@ -147,8 +239,17 @@ class LLMClient:
     def generate_response(self, *a, **kw):
         return self._client.generate_response(*a, **kw)
 
+    def generate_response_stream(self, *a, **kw):
+        return self._client.generate_response_stream(*a, **kw)
+
     def generate_brief_response(self, *a, **kw):
         return self._client.generate_brief_response(*a, **kw)
 
     def test_connection(self):
         return self._client.test_connection()
+
+
+@lru_cache(maxsize=1)
+def get_llm_client() -> LLMClient:
+    """Return the process-wide LLMClient for the configured provider."""
+    return LLMClient()
@@ -0,0 +1,138 @@
+"""Semantic cache for whole chat responses, backed by a Qdrant collection."""
+
+import logging
+import time
+import uuid
+from qdrant_client.http import models
+from config import config
+from services.embedding_service import VECTOR_SIZE, _get_qdrant
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "chat_semantic_cache"
+
+# How often (seconds) a worker prunes after inserting; pruning costs extra Qdrant calls
+PRUNE_INTERVAL = 60
+
+_collection_ensured = False
+_last_prune = 0.0
+
+
+def _ensure_collection(client):
+    global _collection_ensured
+    if _collection_ensured:
+        return
+    if not client.collection_exists(COLLECTION):
+        client.create_collection(
+            collection_name=COLLECTION,
+            vectors_config=models.VectorParams(size=VECTOR_SIZE, distance=models.Distance.COSINE),
+            # Payloads carry whole result sets; only the matched point's is ever read
+            on_disk_payload=True,
+        )
+        logger.info("Created Qdrant collection: %s", COLLECTION)
+    # Backs both the freshness filter and oldest-first eviction
+    client.create_payload_index(
+        collection_name=COLLECTION, field_name="cached_at", field_schema=models.PayloadSchemaType.FLOAT
+    )
+    _collection_ensured = True
+
+
+def _fresh_filter() -> models.Filter:
+    cutoff = time.time() - config.SEMANTIC_CACHE_TTL
+    return models.Filter(must=[models.FieldCondition(key="cached_at", range=models.Range(gte=cutoff))])
+
+
+def lookup(embedding: list[float], tau: float | None = None) -> dict | None:
+    """Return the cached payload for the nearest fresh past message, or None on a miss.
+
+    Entries older than ``SEMANTIC_CACHE_TTL`` seconds are ignored, so replayed
+    answers never show data staler than that. Each point stores its own
+    threshold ``tau`` so individual regions of the embedding space can be
+    tightened later; ``tau`` overrides it when given.
+    """
+    floor = config.SEMANTIC_CACHE_THRESHOLD if tau is None else tau
+    try:
+        client = _get_qdrant()
+        _ensure_collection(client)
+        hits = client.query_points(
+            collection_name=COLLECTION,
+            query=embedding,
+            query_filter=_fresh_filter(),
+            limit=1,
+            with_payload=True,
+            score_threshold=floor,
+        ).points
+    except Exception as e:
+        logger.error("Semantic cache lookup failed: %s", e)
+        return None
+
+    if not hits:
+        return None
+    hit = hits[0]
+    point_tau = hit.payload.get("tau", floor) if tau is None else tau
+    if hit.score < point_tau:
+        return None
+    logger.info("Semantic cache hit (score=%.3f)", hit.score)
+    return hit.payload
+
+
+def insert(embedding: list[float], payload: dict, tau: float | None = None) -> None:
+    """Store a response payload under the message embedding, pruning the cache periodically."""
+    try:
+        client = _get_qdrant()
+        _ensure_collection(client)
+        client.upsert(
+            collection_name=COLLECTION,
+            points=[
+                models.PointStruct(
+                    id=str(uuid.uuid4()),
+                    vector=embedding,
+                    payload={
+                        **payload,
+                        "tau": config.SEMANTIC_CACHE_THRESHOLD if tau is None else tau,
+                        "cached_at": time.time(),
+                    },
+                )
+            ],
+        )
+        _maybe_prune(client)
+    except Exception as e:
+        logger.error("Semantic cache insert failed: %s", e)
+
+
+def _maybe_prune(client) -> None:
+    global _last_prune
+    now = time.monotonic()
+    if now - _last_prune < PRUNE_INTERVAL:
+        return
+    _last_prune = now
+    _prune(client)
+
+
+def _prune(client) -> None:
+    """Drop expired entries, then the oldest ones beyond SEMANTIC_CACHE_MAX_ENTRIES."""
+    cutoff = time.time() - config.SEMANTIC_CACHE_TTL
+    client.delete(
+        collection_name=COLLECTION,
+        points_selector=models.FilterSelector(filter=models.Filter(should=[
+            models.FieldCondition(key="cached_at", range=models.Range(lt=cutoff)),
+            # Entries written before cached_at existed can never be served
+            models.IsEmptyCondition(is_empty=models.PayloadField(key="cached_at")),
+        ])),
+        wait=False,
+    )
+
+    excess = client.count(collection_name=COLLECTION, exact=False).count - config.SEMANTIC_CACHE_MAX_ENTRIES
+    if excess <= 0:
+        return
+    oldest, _ = client.scroll(
+        collection_name=COLLECTION,
+        limit=excess,
+        order_by=models.OrderBy(key="cached_at", direction=models.Direction.ASC),
+        with_payload=False,
+    )
+    client.delete(
+        collection_name=COLLECTION,
+        points_selector=models.PointIdsList(points=[p.id for p in oldest]),
+        wait=False,
+    )
@@ -0,0 +1,79 @@
+"""Chat session storage backed by Redis, shared across worker processes.
+
+Redis failures are logged and treated as an empty store, so chat keeps
+answering (without history) while Redis is down.
+"""
+
+import json
+import logging
+import redis
+from config import config
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "sess:"
+SESSION_TTL = 86400  # seconds of inactivity before a session expires
+
+# Module-level singleton (lazy-loaded)
+_redis_client = None
+
+
+def _get_redis():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(config.REDIS_URL, decode_responses=True)
+    return _redis_client
+
+
+def _key(session_id: str) -> str:
+    return f"{KEY_PREFIX}{session_id}"
+
+
+def append_message(session_id: str, entry: dict) -> None:
+    """Append a message to a session and refresh its expiry."""
+    key = _key(session_id)
+    try:
+        pipe = _get_redis().pipeline()
+        pipe.rpush(key, json.dumps(entry, default=str))
+        pipe.expire(key, SESSION_TTL)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.error("Session append failed: %s", e)
+
+
+def get_messages(session_id: str) -> list | None:
+    """Return all messages in a session, or None if it does not exist."""
+    try:
+        raw = _get_redis().lrange(_key(session_id), 0, -1)
+    except redis.RedisError as e:
+        logger.error("Session read failed: %s", e)
+        return None
+    if not raw:
+        return None
+    return [json.loads(m) for m in raw]
+
+
+def list_sessions() -> list:
+    """Return id, message count and first-message preview for every session."""
+    try:
+        r = _get_redis()
+        keys = list(r.scan_iter(match=f"{KEY_PREFIX}*", count=500))
+        if not keys:
+            return []
+
+        pipe = r.pipeline()
+        for key in keys:
+            pipe.lindex(key, 0)
+            pipe.llen(key)
+        replies = pipe.execute()
+    except redis.RedisError as e:
+        logger.error("Session listing failed: %s", e)
+        return []
+
+    out = []
+    for key, first, count in zip(keys, replies[::2], replies[1::2]):
+        if not count:
+            continue  # expired between SCAN and the pipeline
+        preview = json.loads(first)["content"][:80] if first else ""
+        out.append({"session_id": key[len(KEY_PREFIX):], "message_count": count, "preview": preview})
+    return out
@@ -0,0 +1,34 @@
+"""Tests for the read-only SQL guard in DatabaseService.
+
+Run from backend/: python -m unittest discover tests
+"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.database_service import DatabaseService, _LEAD_RE  # noqa: E402
+
+
+class LeadRegexTest(unittest.TestCase):
+    def test_comment_run_is_linear(self):
+        # Overlapping /* ... */ matches used to make this take seconds (4x per extra 8 bytes)
+        payload = "/**/" * 5000 + "X"
+        start = time.perf_counter()
+        self.assertIsNone(_LEAD_RE.match(payload))
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    def test_allows_leading_comments(self):
+        self.assertTrue(DatabaseService._is_safe_query("/* top */ -- note\n SELECT 1"))
+        self.assertTrue(DatabaseService._is_safe_query("/** x **/ WITH t AS (SELECT 1) SELECT * FROM t"))
+
+    def test_rejects_writes_behind_comments(self):
+        self.assertFalse(DatabaseService._is_safe_query("/* SELECT */ DELETE FROM accounts"))
+        self.assertFalse(DatabaseService._is_safe_query("/*/ SELECT */ DROP TABLE accounts"))
+
+
+if __name__ == "__main__":
+    unittest.main()
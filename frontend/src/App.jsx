@@ -1,5 +1,5 @@
 import { useState, useEffect, useRef } from 'react';
-import { sendMessage, executeSQL, getTables, getTableInfo, testConnection } from './api';
+import { streamMessage, executeSQL, getTables, getTableInfo, testConnection } from './api';
 import SqlBlock from './components/SqlBlock';
 import ResultTable from './components/ResultTable';
 import SchemaExplorer from './components/SchemaExplorer';
@@ -145,19 +145,36 @@ export default function App() {
         // Chat mode — RAG pipeline
         setMessages(prev => [...prev, { role: 'user', content: text }]);
         setLoading(true);
+        // Answer text is painted token by token as it streams in
+        const updateLast = (fn) => setMessages(prev => [...prev.slice(0, -1), fn(prev[prev.length - 1])]);
+        // Once `meta` has added the assistant bubble, errors replace it instead of adding another
+        let started = false;
+        const showError = (content) => {
+            if (started) updateLast(m => ({ ...m, content }));
+            else setMessages(prev => [...prev, { role: 'assistant', content }]);
+        };
         try {
-            const data = await sendMessage(text, sessionId);
-            if (!sessionId && data.session_id) setSessionId(data.session_id);
-            const msg = data.message;
-            setMessages(prev => [...prev, msg]);
-            if (msg.sql_query) {
-                setHistory(prev => [{ query: msg.sql_query, time: Date.now() }, ...prev].slice(0, 50));
-            }
+            await streamMessage(text, sessionId, (event, data) => {
+                if (event === 'meta') {
+                    if (!sessionId && data.session_id) setSessionId(data.session_id);
+                    setLoading(false);
+                    started = true;
+                    setMessages(prev => [...prev, {
+                        role: 'assistant', content: '', sql_query: data.sql_query, sql_result: data.sql_result,
+                    }]);
+                    if (data.sql_query) {
+                        setHistory(prev => [{ query: data.sql_query, time: Date.now() }, ...prev].slice(0, 50));
+                    }
+                } else if (event === 'token') {
+                    updateLast(m => ({ ...m, content: m.content + data.content }));
+                } else if (event === 'done') {
+                    updateLast(() => data.message);
+                } else if (event === 'error') {
+                    showError(`Error: ${data.error}`);
+                }
+            });
         } catch (e) {
-            setMessages(prev => [...prev, {
-                role: 'assistant',
-                content: `Connection error: ${e.message}. Make sure the backend is running on port 5000.`,
-            }]);
+            showError(`Connection error: ${e.message}. Make sure the backend is running on port 5001.`);
         }
         setLoading(false);
     };
@@ -1,15 +1,24 @@
 #!/usr/bin/env python3
 """Seed schema embeddings into Qdrant for the RAG pipeline."""
 
+import argparse
+import asyncio
+import hashlib
+import json
 import sys, os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from typing import Final, NamedTuple
 
-from services.embedding_service import EmbeddingService
 
-SCHEMAS = [
-    {
-        "table_name": "branches",
-        "ddl_statement": """CREATE TABLE branches (
+class SchemaRow(NamedTuple):
+    table_name: str
+    ddl_statement: str
+    description: str
+
+
+SCHEMAS: Final[tuple[SchemaRow, ...]] = (
+    SchemaRow(
+        "branches",
+        """CREATE TABLE branches (
     branch_id SERIAL PRIMARY KEY,
     branch_name VARCHAR(100) NOT NULL,
     branch_code VARCHAR(10) UNIQUE NOT NULL,
@@ -20,11 +29,11 @@ SCHEMAS = [
     phone VARCHAR(20),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );""",
-        "description": "Bank branch locations and contact information",
-    },
-    {
-        "table_name": "customers",
-        "ddl_statement": """CREATE TABLE customers (
+        "Bank branch locations and contact information",
+    ),
+    SchemaRow(
+        "customers",
+        """CREATE TABLE customers (
     customer_id SERIAL PRIMARY KEY,
     first_name VARCHAR(50) NOT NULL,
     last_name VARCHAR(50) NOT NULL,
@@ -46,11 +55,11 @@ SCHEMAS = [
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );""",
-        "description": "Customer demographics, employment, income, credit score, and risk data",
-    },
-    {
-        "table_name": "accounts",
-        "ddl_statement": """CREATE TABLE accounts (
+        "Customer demographics, employment, income, credit score, and risk data",
+    ),
+    SchemaRow(
+        "accounts",
+        """CREATE TABLE accounts (
     account_id SERIAL PRIMARY KEY,
     customer_id INTEGER REFERENCES customers(customer_id),
     account_number VARCHAR(20) UNIQUE NOT NULL,
@@ -66,11 +75,11 @@ SCHEMAS = [
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );""",
-        "description": "Bank accounts (checking, savings, money market) with balances and types",
-    },
-    {
-        "table_name": "transactions",
-        "ddl_statement": """CREATE TABLE transactions (
+        "Bank accounts (checking, savings, money market) with balances and types",
+    ),
+    SchemaRow(
+        "transactions",
+        """CREATE TABLE transactions (
     transaction_id SERIAL PRIMARY KEY,
     account_id INTEGER REFERENCES accounts(account_id),
     transaction_type VARCHAR(20),
@@ -86,11 +95,11 @@ SCHEMAS = [
     status VARCHAR(20),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );""",
-        "description": "All account transactions including deposits, withdrawals, transfers, and purchases",
-    },
-    {
-        "table_name": "credit_cards",
-        "ddl_statement": """CREATE TABLE credit_cards (
+        "All account transactions including deposits, withdrawals, transfers, and purchases",
+    ),
+    SchemaRow(
+        "credit_cards",
+        """CREATE TABLE credit_cards (
     card_id SERIAL PRIMARY KEY,
     customer_id INTEGER REFERENCES customers(customer_id),
     card_number VARCHAR(16) UNIQUE NOT NULL,
@@ -107,11 +116,11 @@ SCHEMAS = [
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );""",
-        "description": "Credit card information including type, limit, balance, and APR",
-    },
-    {
-        "table_name": "credit_card_transactions",
-        "ddl_statement": """CREATE TABLE credit_card_transactions (
+        "Credit card information including type, limit, balance, and APR",
+    ),
+    SchemaRow(
+        "credit_card_transactions",
+        """CREATE TABLE credit_card_transactions (
     cc_transaction_id SERIAL PRIMARY KEY,
     card_id INTEGER REFERENCES credit_cards(card_id),
     transaction_type VARCHAR(20),
@@ -125,11 +134,11 @@ SCHEMAS = [
     rewards_earned DECIMAL(8,2) DEFAULT 0.00,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );""",
-        "description": "Credit card transaction history including purchases, payments, and rewards",
-    },
-    {
-        "table_name": "loans",
-        "ddl_statement": """CREATE TABLE loans (
+        "Credit card transaction history including purchases, payments, and rewards",
+    ),
+    SchemaRow(
+        "loans",
+        """CREATE TABLE loans (
     loan_id SERIAL PRIMARY KEY,
     customer_id INTEGER REFERENCES customers(customer_id),
     loan_number VARCHAR(20) UNIQUE NOT NULL,
@@ -150,11 +159,11 @@ SCHEMAS = [
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );""",
-        "description": "Loans including mortgage, personal, auto, and business with terms and status",
-    },
-    {
-        "table_name": "loan_payments",
-        "ddl_statement": """CREATE TABLE loan_payments (
+        "Loans including mortgage, personal, auto, and business with terms and status",
+    ),
+    SchemaRow(
+        "loan_payments",
+        """CREATE TABLE loan_payments (
     payment_id SERIAL PRIMARY KEY,
     loan_id INTEGER REFERENCES loans(loan_id),
     payment_date DATE NOT NULL,
@@ -167,19 +176,91 @@ SCHEMAS = [
     late_fee DECIMAL(8,2) DEFAULT 0.00,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );""",
-        "description": "Loan payment records with principal/interest breakdown and payment method",
-    },
-]
+        "Loan payment records with principal/interest breakdown and payment method",
+    ),
+)
+
+
+CACHE_PATH = os.path.join(os.path.dirname(__file__), "schemas.cache.json")
+
+
+def _parse_columns(ddl: str) -> list[list[str]]:
+    """Return [[column, TYPE], ...] for a CREATE TABLE statement."""
+    import sqlglot
+    from sqlglot import exp
+
+    tree = sqlglot.parse_one(ddl, read="postgres")
+    return [[c.name, c.args["kind"].sql(dialect="postgres")] for c in tree.find_all(exp.ColumnDef)]
+
+
+def _load_columns() -> list[list[list[str]]]:
+    """Column metadata per SCHEMAS row, parsed once and cached on disk by DDL hash.
 
+    sqlglot is only imported when a DDL is missing from the cache.
+    """
+    try:
+        with open(CACHE_PATH) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+
+    keys = [hashlib.sha256(row.ddl_statement.encode()).hexdigest() for row in SCHEMAS]
+    missing = [(k, row) for k, row in zip(keys, SCHEMAS) if k not in cache]
+    for key, row in missing:
+        cache[key] = _parse_columns(row.ddl_statement)
+    if missing or len(cache) != len(set(keys)):
+        try:
+            with open(CACHE_PATH, "w") as f:
+                json.dump({k: cache[k] for k in keys}, f, indent=1)
+        except OSError as e:
+            # The cache only saves parsing time; a read-only checkout still seeds
+            print(f"⚠️  Could not write {CACHE_PATH}: {e}")
+    return [cache[k] for k in keys]
+
+
+def _embed_text(table_name: str, columns: list[list[str]], description: str) -> str:
+    cols = ", ".join(f"{name} {type_}" for name, type_ in columns)
+    return f"table {table_name} columns: {cols}; description: {description}"
+
+
+async def main():
+    # Imported here so importing this module (e.g. for SCHEMAS) stays side-effect free
+    from services.embedding_service import get_embedding_service, schema_hash
 
-def main():
     print("🔄 Seeding schema embeddings into Qdrant...")
-    svc = EmbeddingService()
-    svc.embed_all_schemas(SCHEMAS)
-    print(f"✅ Embedded {len(SCHEMAS)} table schemas successfully!")
-    stored = svc.get_all_schemas()
-    print(f"📊 Verified {len(stored)} schemas in Qdrant")
+    svc = get_embedding_service()
+    if not svc.ensure_collection():
+        sys.exit("❌ Qdrant collection is unavailable; is Qdrant running?")
+
+    names, _, descs = zip(*SCHEMAS)
+    texts = list(map(_embed_text, names, _load_columns(), descs))
+
+    # Drop leftovers from runs that used random point ids, so each table has one point
+    svc.delete_stale_schemas()
+    # Skip schemas whose stored content hash matches; only changed ones are re-embedded
+    existing = {s["table_name"]: s.get("ddl_hash") for s in svc.get_all_schemas()}
+    changed = [
+        i for i, (row, text) in enumerate(zip(SCHEMAS, texts))
+        if existing.get(row.table_name) != schema_hash(*row, text)
+    ]
+    if changed and not await svc.aembed_all_schemas([SCHEMAS[i] for i in changed], [texts[i] for i in changed]):
+        sys.exit(f"❌ Failed to embed {len(changed)} table schemas; see the error above")
+    # Count on a worker thread (reusing the service's client) while the summary prints
+    size = asyncio.create_task(asyncio.to_thread(svc.count_schemas))
+    print(f"✅ Embedded {len(changed)} table schemas successfully! ({len(SCHEMAS) - len(changed)} unchanged)")
+    print(f"📊 Collection size: {await size}")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="print the schema count and exit without touching Qdrant"
+    )
+    args = parser.parse_args()
+    if args.dry_run:
+        print(f"{len(SCHEMAS)} table schemas defined")
+        sys.exit(0)
+
+    # backend/ modules import each other top-level (``from config import config``)
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+    asyncio.run(main())
@@ -19,9 +19,9 @@ if [ ! -f "$PROJECT_DIR/.env" ]; then
 fi
 
 echo ""
-echo "Starting PostgreSQL and Qdrant..."
+echo "Starting PostgreSQL, Qdrant and Redis..."
 cd "$PROJECT_DIR"
-docker-compose up -d postgres qdrant 2>&1 | grep -v "WARN" || true
+docker-compose up -d postgres qdrant redis 2>&1 | grep -v "WARN" || true
 
 echo -n "Waiting for PostgreSQL..."
 for i in {1..30}; do
@@ -86,7 +86,7 @@ echo "==================================="
 echo ""
 echo "Start the app:"
 echo ""
-echo "  Terminal 1:  cd backend && source venv/bin/activate && python app.py"
+echo "  Terminal 1:  cd backend && source venv/bin/activate && gunicorn -c gunicorn.conf.py 'app:create_app()'"
 echo "  Terminal 2:  cd frontend && npm run dev"
 echo ""
 echo "  Then open:   http://localhost:5173"
@@ -101,7 +101,7 @@ if [[ $REPLY =~ ^[Yy]$ ]]; then
 
     cd "$PROJECT_DIR/backend"
     source venv/bin/activate
-    python app.py &
+    gunicorn -c gunicorn.conf.py 'app:create_app()' &
 
     cd "$PROJECT_DIR/frontend"
     npm run dev &